@@ -1,26 +1,34 @@
 # cli.py
 import click
+import orjson
+import asyncio
 import time
 import csv
 import os
 import re
-import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import urlparse
 from zoneinfo import ZoneInfo
 
 import db
-from scraper import fetch_html, extract_sections
 
 
 # -------------------------------------------------
 # Helpers
 # -------------------------------------------------
 
+BASE_DIR = Path(__file__).resolve().parent
+
+_SANITIZE_RE = re.compile(r"[^A-Za-z0-9_]+")
+_LDN = ZoneInfo("Europe/London")
+# Statement URL values that mean "no URL" (compared lowercased).
+_NULL_URLS = frozenset({"", "null", "none", "na", "n/a", "working"})
+
+
 def sanitize_table_name(name: str) -> str:
-    name = re.sub(r"[^A-Za-z0-9_]+", "_", name).strip("_").lower()
-    if not name:
-        name = "table"
+    name = _SANITIZE_RE.sub("_", name).strip("_").lower() or "table"
     if name[0].isdigit():
         name = f"t_{name}"
     return name
@@ -30,6 +38,13 @@ def quote_ident(identifier: str) -> str:
     return '"' + identifier.replace('"', '""') + '"'
 
 
+def csv_cell(row: list, idx) -> str:
+    """Stripped value at column idx, or "" if the column is missing/short."""
+    if idx is None or idx >= len(row):
+        return ""
+    return row[idx].strip()
+
+
 def ensure_table(conn, table_name: str):
     conn.execute(f"""
     CREATE TABLE IF NOT EXISTS {quote_ident(table_name)} (
@@ -52,72 +67,222 @@ def ensure_table(conn, table_name: str):
         status TEXT DEFAULT ''
     );
     """)
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {quote_ident(f'idx_{table_name}_status')} "
+        f"ON {quote_ident(table_name)}(status)"
+    )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {quote_ident(f'idx_{table_name}_compliance')} "
+        f"ON {quote_ident(table_name)}(compliance_level)"
+    )
+    # Partial index matching print_last_review_summary's filter exactly.
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {quote_ident(f'idx_{table_name}_portfolio_lastreview')} "
+        f"ON {quote_ident(table_name)}(portfolio) "
+        f"WHERE last_review IS NOT NULL AND last_review != ''"
+    )
     conn.commit()
 
 
 def upsert_row(conn, table_name: str, product_name: str, data: dict):
+    """Insert or update one row keyed on product_name. Does not commit."""
     if not product_name:
         click.echo(f"⚠️  Skipping upsert: Invalid product_name '{product_name}'")
         return
 
-    fields = ["product_name"] + list(data.keys())
-    values = [product_name] + list(data.values())
+    upsert_rows(conn, table_name, [{"product_name": product_name, **data}])
 
-    placeholders = ", ".join(["?"] * len(fields))
-    updates = ", ".join([f"{quote_ident(f)}=excluded.{quote_ident(f)}" for f in data.keys()])
 
-    conn.execute(
-        f"""
+# (table_name, sorted column names) -> upsert SQL. Reusing the identical
+# string lets sqlite3's statement cache skip re-parsing it.
+_UPSERT_SQL: dict = {}
+
+
+def _upsert_sql(table_name: str, fields: tuple) -> str:
+    key = (table_name, fields)
+    sql = _UPSERT_SQL.get(key)
+    if sql is None:
+        placeholders = ", ".join(["?"] * len(fields))
+        updates = ", ".join(
+            [f"{quote_ident(f)}=excluded.{quote_ident(f)}" for f in fields if f != "product_name"]
+        )
+        sql = f"""
         INSERT INTO {quote_ident(table_name)} ({", ".join(map(quote_ident, fields))})
         VALUES ({placeholders})
         ON CONFLICT(product_name) DO UPDATE SET {updates}
-        """,
-        values,
+        """
+        _UPSERT_SQL[key] = sql
+    return sql
+
+
+def upsert_rows(conn, table_name: str, rows: list):
+    """
+    Insert or update many rows keyed on product_name with one executemany.
+    Every row must carry the same keys, including product_name. Does not commit.
+    """
+    if not rows:
+        return
+
+    fields = tuple(sorted(rows[0]))
+    conn.executemany(
+        _upsert_sql(table_name, fields),
+        [tuple(row[f] for f in fields) for row in rows],
     )
-    conn.commit()
+
+
+def read_csv_rows(csv_path: Path):
+    """
+    Parse one input CSV into upsert-ready row dicts.
+
+    Returns (rows, warnings). Touches no database state, so it is safe to
+    run on a worker thread.
+    """
+    rows = []
+    warnings = []
+
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+
+        # -------- NORMALISE HEADERS ONCE --------
+        header = [
+            h.replace("\ufeff", "").replace("\u00a0", " ").strip()
+            for h in next(reader, [])
+        ]
+        columns = {name: idx for idx, name in enumerate(header)}
+        idx_name = columns.get("Product Name")
+        idx_portfolio = columns.get("Portfolio")
+        idx_url = columns.get("Statement URL")
+        # ----------------------------------------
+
+        # Blank lines are skipped (as DictReader did) before numbering rows.
+        for i, row in enumerate((r for r in reader if r), start=1):
+            product_name = csv_cell(row, idx_name)
+            portfolio = csv_cell(row, idx_portfolio)
+            url = csv_cell(row, idx_url)
+
+            if url.lower() in _NULL_URLS:
+                url = ""
+
+            status = "pending" if url else "no_url"
+
+            if not product_name:
+                warnings.append(f"⚠️  {csv_path.name} row {i}: Missing product name, skipping")
+                continue
+
+            rows.append(
+                {
+                    "product_name": product_name,
+                    "portfolio": portfolio,
+                    "url": url or None,
+                    "status": status,
+                }
+            )
+
+    return rows, warnings
 
 
 def dump_table_to_json(conn, table_name: str, out_path: Path):
-    rows = conn.execute(f"SELECT * FROM {quote_ident(table_name)}").fetchall()
-    data = [dict(r) for r in rows]
+    """
+    Stream a table to a JSON array file, one row at a time.
+
+    Output is identical to json.dumps(rows, ensure_ascii=False, indent=2),
+    but rows are never all held in memory at once.
+    """
+    cur = conn.execute(f"SELECT * FROM {quote_ident(table_name)}")
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
+    with open(out_path, "wb") as out:
+        first = True
+        for row in cur:
+            out.write(b"[\n  " if first else b",\n  ")
+            # Re-indent each object one level so it nests inside the array.
+            out.write(orjson.dumps(dict(row), option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  "))
+            first = False
+        out.write(b"[]" if first else b"\n]")
 
-def scrape_table(conn, table_name: str):
-    rows = conn.execute(
-        f"SELECT product_name, url FROM {quote_ident(table_name)}"
-    ).fetchall()
 
-    url_map = {}
-    skipped = 0
+def scrape_tables(conn, tables: list, concurrency: int = 8, cache_path=None) -> dict:
+    """
+    Scrape every distinct URL across the given tables.
 
-    for row in rows:
-        if row["url"]:
-            url_map.setdefault(row["url"], []).append(row["product_name"])
-        else:
-            skipped += 1
+    A URL listed in several tables (shared platforms) is fetched once and its
+    result written to every row that references it. All URLs are loaded by
+    one async browser, up to `concurrency` pages at a time, with one browser
+    context per host (shared keep-alive connections and cookies). Pages are
+    parsed in worker processes as they arrive; DB writes run afterwards on
+    the calling thread, so sqlite keeps a single writer.
+
+    cache_path enables the HTTP revalidation cache (see
+    scraper.scrape_many): unchanged server-rendered pages reuse the last HTML.
+
+    Returns {table: (distinct URLs scraped, rows skipped)}.
+    """
+    # Imported here: scraper pulls in Playwright/lxml and opens the run logs,
+    # none of which --help or import-only work needs.
+    from scraper import scrape_many
 
-    for url, products in url_map.items():
-        scraped_date = datetime.now(ZoneInfo("Europe/London")).strftime("%d/%m/%Y")
+    url_map = {}  # url -> [(table, product_name), ...]
+    stats = {}
 
-        click.echo(f"\n🔗 [{table_name}] Scraping {url}")
-        #html = fetch_html(url)
-        html = fetch_html(url, context={"table": table_name, "product_names": products})
+    for table_name in tables:
+        rows = conn.execute(
+            f"SELECT product_name, url FROM {quote_ident(table_name)}"
+        ).fetchall()
 
-        if not html:
+        table_urls = set()
+        skipped = 0
+
+        for row in rows:
+            if row["url"]:
+                url_map.setdefault(row["url"], []).append((table_name, row["product_name"]))
+                table_urls.add(row["url"])
+            else:
+                skipped += 1
+
+        stats[table_name] = (len(table_urls), skipped)
+
+    if not url_map:
+        return stats
+
+    # Day-granular, so one value covers the whole run.
+    scraped_date = datetime.now(_LDN).strftime("%d/%m/%Y")
+
+    hosts = {urlparse(url).netloc.lower() for url in url_map}
+    click.echo(f"🔗 Scraping {len(url_map)} URLs across {len(hosts)} hosts")
+
+    contexts = {
+        url: {
+            "table": ", ".join(sorted({t for t, _ in refs})),
+            "product_names": [p for _, p in refs],
+        }
+        for url, refs in url_map.items()
+    }
+    results = asyncio.run(scrape_many(
+        list(url_map),
+        concurrency=concurrency,
+        contexts=contexts,
+        cache_path=cache_path,
+        extract=True,
+    ))
+
+    for url, data in results.items():
+        if data is None:
             status = {"status": "failed", "fetched_at": scraped_date}
+        elif not any(data.values()):
+            status = {"status": "no_content", "fetched_at": scraped_date}
         else:
-            data = extract_sections(html)
-            if not any(data.values()):
-                status = {"status": "no_content", "fetched_at": scraped_date}
-            else:
-                status = {**data, "status": "success", "fetched_at": scraped_date}
+            status = {**data, "status": "success", "fetched_at": scraped_date}
 
-        for product in products:
-            upsert_row(conn, table_name, product, status)
+        by_table = {}
+        for table_name, product in url_map[url]:
+            if product:
+                by_table.setdefault(table_name, []).append({"product_name": product, **status})
 
-    return len(url_map), skipped
+        with conn:
+            for table_name, table_rows in by_table.items():
+                upsert_rows(conn, table_name, table_rows)
+
+    return stats
 
 
 def print_last_review_summary(conn, table_name: str):
@@ -157,7 +322,14 @@ def cli():
 
 @cli.command("run-all")
 @click.option("--db-path", default="scraped_content.db")
-def run_all(db_path):
+@click.option("--concurrency", default=8, show_default=True, help="Number of pages loaded in parallel.")
+@click.option(
+    "--http-cache/--no-http-cache",
+    default=True,
+    show_default=True,
+    help="Reuse last run's HTML for static pages the server reports as unchanged (http_cache.db).",
+)
+def run_all(db_path, concurrency, http_cache):
     """
     Monthly command:
     - Wipes DB
@@ -167,15 +339,19 @@ def run_all(db_path):
     - Prints per-portfolio last_review counts
     - Exports outputs/<table>.json
     """
-    base_dir = Path(__file__).resolve().parent
-    inputs_dir = base_dir / "inputs"
-    outputs_dir = base_dir / "outputs"
+    inputs_dir = BASE_DIR / "inputs"
+    outputs_dir = BASE_DIR / "outputs"
 
     if not inputs_dir.exists():
         click.echo("❌ inputs/ folder not found")
         return
 
-    csv_files = sorted(inputs_dir.glob("*.csv"))
+    # scandir entries carry cached file-type info, so no extra stat() per file.
+    csv_files = sorted(
+        Path(entry.path)
+        for entry in os.scandir(inputs_dir)
+        if entry.name.endswith(".csv") and entry.is_file()
+    )
     if not csv_files:
         click.echo("❌ No CSV files found in inputs/")
         return
@@ -183,7 +359,7 @@ def run_all(db_path):
     # Wipe database
     db_file = Path(db_path)
     if not db_file.is_absolute():
-        db_file = base_dir / db_file
+        db_file = BASE_DIR / db_file
 
     if db_file.exists():
         db_file.unlink()
@@ -191,66 +367,43 @@ def run_all(db_path):
 
     conn = db.connect(str(db_file))
 
-    tables = []
+    tables = [sanitize_table_name(csv_path.stem) for csv_path in csv_files]
 
     # -----------------------------------------
     # Import CSVs
     # -----------------------------------------
-    for csv_path in csv_files:
-        table = sanitize_table_name(csv_path.stem)
-        tables.append(table)
-
-        click.echo(f"\n📥 Importing {csv_path.name} → {table}")
-        ensure_table(conn, table)
+    # Files are parsed on a thread pool; sqlite allows a single writer, so
+    # each table is written here as its parse completes (in input order).
+    with ThreadPoolExecutor(max_workers=min(8, len(csv_files))) as pool:
+        parsed = pool.map(read_csv_rows, csv_files)
 
-        with open(csv_path, newline="", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
+        for csv_path, table, (import_rows, warnings) in zip(csv_files, tables, parsed):
+            click.echo(f"\n📥 Importing {csv_path.name} → {table}")
+            ensure_table(conn, table)
 
-            for i, row in enumerate(reader, start=1):
+            for warning in warnings:
+                click.echo(warning)
 
-                # -------- NORMALISE HEADERS & VALUES --------
-                row_norm = {}
-                for k, v in row.items():
-                    if k is None:
-                        continue
-                    nk = k.replace("\ufeff", "").replace("\u00a0", " ").strip()
-                    row_norm[nk] = (v or "").strip()
-                # --------------------------------------------
+            # One transaction per CSV: a single commit instead of one per row.
+            with conn:
+                upsert_rows(conn, table, import_rows)
 
-                product_name = row_norm.get("Product Name", "")
-                portfolio = row_norm.get("Portfolio", "")
-                url = row_norm.get("Statement URL", "")
-
-                if url.lower() in {"", "null", "none", "na", "n/a", "working"}:
-                    url = ""
-
-                status = "pending" if url else "no_url"
-
-                if not product_name:
-                    click.echo(f"⚠️  {csv_path.name} row {i}: Missing product name, skipping")
-                    continue
-
-                upsert_row(
-                    conn,
-                    table,
-                    product_name,
-                    {
-                        "portfolio": portfolio,
-                        "url": url or None,
-                        "status": status,
-                    },
-                )
-
-        click.echo(f"✅ Imported {table}")
+            click.echo(f"✅ Imported {table}")
 
     # -----------------------------------------
     # Scrape
     # -----------------------------------------
     click.echo("\n🚀 Starting scrape")
+    cache_path = str(BASE_DIR / "http_cache.db") if http_cache else None
+    stats = scrape_tables(conn, tables, concurrency=concurrency, cache_path=cache_path)
     for table in tables:
-        scraped, skipped = scrape_table(conn, table)
+        scraped, skipped = stats[table]
         click.echo(f"✅ {table}: scraped {scraped} URLs, skipped {skipped}")
 
+    # Refresh planner statistics now status/compliance_level/last_review are
+    # filled, before the summary and export queries use those indexes.
+    conn.execute("ANALYZE")
+
     # -----------------------------------------
     # Last review summary (per portfolio)
     # -----------------------------------------
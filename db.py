@@ -3,6 +3,7 @@ import os
 import sqlite3
 
 DEFAULT_DB = os.environ.get("SCRAPER_DB", "scraped_content.db")
+DEFAULT_HTTP_CACHE_DB = os.environ.get("SCRAPER_HTTP_CACHE_DB", "http_cache.db")
 
 
 def connect(db_path: str = DEFAULT_DB):
@@ -10,6 +11,12 @@ def connect(db_path: str = DEFAULT_DB):
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
+    # WAL + NORMAL only fsyncs at checkpoints; a crash can lose the last
+    # transaction but never corrupts the file. Fine for a rebuildable scrape DB.
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-65536;")      # 64MB page cache
+    conn.execute("PRAGMA mmap_size=268435456;")    # 256MB
     conn.execute("PRAGMA foreign_keys=ON;")
     return conn
 
@@ -41,29 +48,94 @@ def init_db(db_path: str = DEFAULT_DB):
         status TEXT DEFAULT ''
     );
     """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_status ON pages(status);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_compliance ON pages(compliance_level);")
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_pages_portfolio_lastreview ON pages(portfolio)
+    WHERE last_review IS NOT NULL AND last_review != '';
+    """)
     conn.commit()
     return conn
 
 
+def init_http_cache(db_path: str = DEFAULT_HTTP_CACHE_DB):
+    """
+    Open the HTTP revalidation cache (static HTML + ETag/Last-Modified per URL).
+    Lives in its own file because run-all wipes the main database each run.
+    """
+    conn = connect(db_path)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS http_cache (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        body TEXT,
+        fetched_at TEXT           -- ISO 8601
+    );
+    """)
+    conn.commit()
+    return conn
+
+
+def get_cached_page(conn, url: str):
+    """Return the http_cache row for url, or None."""
+    return conn.execute(
+        "SELECT etag, last_modified, body FROM http_cache WHERE url = ?", (url,)
+    ).fetchone()
+
+
+def put_cached_page(conn, url: str, etag, last_modified, body: str, fetched_at: str):
+    """Store (or replace) the cached body and validators for url."""
+    conn.execute("""
+        INSERT INTO http_cache (url, etag, last_modified, body, fetched_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(url) DO UPDATE SET
+            etag=excluded.etag,
+            last_modified=excluded.last_modified,
+            body=excluded.body,
+            fetched_at=excluded.fetched_at
+    """, (url, etag, last_modified, body, fetched_at))
+    conn.commit()
+
+
 def upsert_page(conn, product_name: str, data: dict):
-    """Insert or update a page record based on product_name (unique)."""
+    """
+    Insert or update a page record based on product_name (unique).
+    Does not commit: callers wrap bulk work in a single transaction.
+    """
 
     if not product_name:
         print(f"⚠️  Skipping upsert: Invalid product_name '{product_name}'")
         return
 
-    fields = ["product_name"] + list(data.keys())
-    values = [product_name] + list(data.values())
+    upsert_pages(conn, [{"product_name": product_name, **data}])
 
-    placeholders = ", ".join(["?"] * len(fields))
-    updates = ", ".join([f"{field}=excluded.{field}" for field in data.keys()])
 
-    try:
-        conn.execute(f"""
+# Sorted column names -> upsert SQL, so repeat calls reuse one statement.
+_UPSERT_SQL: dict = {}
+
+
+def upsert_pages(conn, rows: list):
+    """
+    Insert or update many page records in one executemany.
+    Every row must carry the same keys, including product_name. Does not commit.
+    """
+    if not rows:
+        return
+
+    fields = tuple(sorted(rows[0]))
+    sql = _UPSERT_SQL.get(fields)
+    if sql is None:
+        placeholders = ", ".join(["?"] * len(fields))
+        updates = ", ".join([f"{field}=excluded.{field}" for field in fields if field != "product_name"])
+        sql = f"""
             INSERT INTO pages ({", ".join(fields)})
             VALUES ({placeholders})
             ON CONFLICT(product_name) DO UPDATE SET {updates}
-        """, values)
-        conn.commit()
+        """
+        _UPSERT_SQL[fields] = sql
+
+    try:
+        conn.executemany(sql, [tuple(row[f] for f in fields) for row in rows])
     except sqlite3.Error as e:
-        print(f"❗ Database error during upsert for '{product_name}': {e}")
+        print(f"❗ Database error during bulk upsert of {len(rows)} rows: {e}")
@@ -12,22 +12,45 @@ Logs:
 Supports optional context passed by caller:
 - context = {"table": "...", "product_names": ["...", "..."]}
 
+Optional HTTP revalidation cache (see scrape_many(cache_path=...)):
+- Server-rendered pages whose server answers 304 to a conditional GET
+  reuse the last stored HTML without being downloaded again. Pages that
+  needed the browser are not cached.
+
+Static fast path (see Scraper(static_first=...)):
+- Server-rendered pages are read with a plain GET; Playwright is only
+  launched for pages whose raw HTML has no statement sections.
+
 Dependencies:
-    pip install playwright beautifulsoup4 lxml python-dateutil rapidfuzz
+    pip install playwright lxml python-dateutil rapidfuzz requests
     playwright install
 """
 
-from bs4 import BeautifulSoup
+from lxml import etree
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import dateutil.parser as date_parser
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from rapidfuzz import fuzz, process
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+import asyncio
+import atexit
+import copy
+import multiprocessing
+import queue
 import time
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import re
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from urllib.parse import urlparse
 from zoneinfo import ZoneInfo
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set, Tuple, Union
+
+import db
 
 
 # -------------------------
@@ -49,10 +72,13 @@ class JsonLineFormatter(logging.Formatter):
     def __init__(self, tz: str):
         super().__init__()
         self.tz = tz
+        self._zone = ZoneInfo(tz)
 
     def format(self, record: logging.LogRecord) -> str:
+        # record.created, not now(): the queue listener writes records later.
+        created = datetime.fromtimestamp(record.created, self._zone)
         payload = {
-            "timestamp": datetime.now(ZoneInfo(self.tz)).isoformat(timespec="seconds"),
+            "timestamp": created.isoformat(timespec="seconds"),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -62,7 +88,26 @@ class JsonLineFormatter(logging.Formatter):
         }
         if record.exc_info:
             payload["exception"] = self.formatException(record.exc_info)
-        return json.dumps(payload, ensure_ascii=False)
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+class _RecordQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting (and exc_info) to the file handlers."""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def setup_logging(
@@ -70,6 +115,8 @@ def setup_logging(
     tz: str = "Europe/London",
     also_json: bool = True,
 ):
+    global _listener
+
     os.makedirs(log_dir, exist_ok=True)
     today = datetime.now(ZoneInfo(tz)).strftime("%Y-%m-%d")
 
@@ -81,6 +128,7 @@ def setup_logging(
 
     for h in list(root.handlers):
         root.removeHandler(h)
+    _stop_listener()
 
     context_filter = ContextFilter()
 
@@ -94,7 +142,7 @@ def setup_logging(
             "table=%(table)s url=%(url)s products=%(product_names)s :: %(message)s"
         )
     )
-    root.addHandler(file_handler)
+    file_handlers = [file_handler]
 
     # JSONL log
     if also_json:
@@ -102,7 +150,13 @@ def setup_logging(
         json_handler.setLevel(logging.DEBUG)
         json_handler.addFilter(context_filter)
         json_handler.setFormatter(JsonLineFormatter(tz))
-        root.addHandler(json_handler)
+        file_handlers.append(json_handler)
+
+    # File writes happen on a listener thread, so scraping never waits on disk.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *file_handlers, respect_handler_level=True)
+    _listener.start()
+    root.addHandler(_RecordQueueHandler(log_queue))
 
     # Console (minimal)
     console_handler = logging.StreamHandler()
@@ -113,6 +167,7 @@ def setup_logging(
 
 # Initialise logging immediately
 setup_logging()
+atexit.register(_stop_listener)
 
 log = logging.getLogger("scraper")
 
@@ -135,30 +190,135 @@ def _ctx(context: Optional[Dict[str, Any]], url: str) -> Dict[str, Any]:
 # -------------------------
 # Cookie handling
 # -------------------------
-def handle_cookie_banner(page, *, extra: Dict[str, Any]) -> bool:
-    selectors = [
-        "#onetrust-accept-btn-handler",
-        "button:has-text('Accept')",
-    ]
-    texts = ["Accept", "OK", "Agree"]
-
-    for sel in selectors:
-        try:
-            locator = page.locator(sel)
-            if locator.count() > 0 and locator.first.is_visible():
-                locator.first.click(timeout=2000)
-                log.debug(f"Clicked cookie accept button: {sel}", extra=extra)
-                return True
-        except Exception as e:
-            log.debug(f"Cookie selector failed ({sel}): {e}", extra=extra)
+# Known accept buttons, joined into one CSS selector group so a single
+# locator query covers them all.
+_ACCEPT_SELECTOR = ", ".join([
+    "#onetrust-accept-btn-handler",
+    "button:has-text('Accept')",
+])
 
-    for txt in texts:
-        try:
-            page.get_by_text(txt, exact=True).click(timeout=2000)
-            log.debug(f"Clicked cookie consent text: '{txt}'", extra=extra)
+# Plain-CSS accept buttons for the in-page script (no Playwright pseudo-classes).
+_ACCEPT_CSS = ", ".join([
+    "#onetrust-accept-btn-handler",
+    "#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
+    "button[name='cookies'][value='accept']",     # GOV.UK cookie banner
+])
+# Button labels that accept cookies; only clicked inside _CONSENT_CONTAINER_CSS.
+_ACCEPT_LABEL_RE = r"^(accept|agree|allow all|ok|got it)\b"
+_ACCEPT_NAME_RE = re.compile(_ACCEPT_LABEL_RE, re.IGNORECASE)
+# Elements that look like a cookie/consent banner.
+_CONSENT_CONTAINER_CSS = ", ".join([
+    "[id*='cookie' i]", "[class*='cookie' i]",
+    "[id*='consent' i]", "[class*='consent' i]",
+    "[aria-label*='cookie' i]",
+])
+
+# One round-trip: find a visible accept control and click it in the page.
+_COOKIE_JS = """
+({ selectors, labelPattern, containers }) => {
+    const visible = (el) =>
+        el.getClientRects().length > 0 && getComputedStyle(el).visibility !== "hidden";
+    // Mark the button so the caller can wait for it to go away.
+    const press = (el, strategy) => {
+        el.setAttribute("data-scraper-clicked", "");
+        el.click();
+        return { clicked: true, strategy };
+    };
+
+    for (const el of document.querySelectorAll(selectors)) {
+        if (visible(el)) return press(el, "selector");
+    }
+
+    const label = new RegExp(labelPattern, "i");
+
+    // Most statement pages have no banner left to dismiss: skip the
+    // button scan unless an element looks like one. (Not the page text:
+    // footer "Cookies"/"Privacy" links are everywhere, and innerText
+    // forces a layout.)
+    if (!document.querySelector(containers)) return { clicked: false, strategy: null };
+
+    // Buttons only (a link would navigate away), and only inside a consent
+    // container: the same rule as the locator fallback in handle_cookie_banner.
+    const candidates = document.querySelectorAll(
+        "button, [role='button'], input[type='button'], input[type='submit']"
+    );
+    for (const el of candidates) {
+        if (!el.closest(containers)) continue;
+        const text = (el.innerText || el.value || "").trim();
+        if (label.test(text) && visible(el)) return press(el, "label");
+    }
+
+    return { clicked: false, strategy: null };
+}
+"""
+
+
+# True once the clicked button is detached or hidden (banner dismissed).
+_BANNER_GONE_JS = """
+() => {
+    const el = document.querySelector("[data-scraper-clicked]");
+    return !el || el.getClientRects().length === 0;
+}
+"""
+
+
+async def handle_cookie_banner(page, *, extra: Dict[str, Any]) -> bool:
+    try:
+        result = await page.evaluate(
+            _COOKIE_JS,
+            {
+                "selectors": _ACCEPT_CSS,
+                "labelPattern": _ACCEPT_LABEL_RE,
+                "containers": _CONSENT_CONTAINER_CSS,
+            },
+        )
+    except Exception as e:
+        # e.g. the page navigated mid-evaluate; fall back to a locator click.
+        log.debug("Cookie script failed: %s", e, extra=extra)
+    else:
+        if result.get("clicked"):
+            log.debug("Clicked cookie banner (%s)", result.get("strategy"), extra=extra)
+            # Returns as soon as the banner is gone, instead of a fixed sleep.
+            try:
+                await page.wait_for_function(_BANNER_GONE_JS, timeout=2000)
+            except Exception as e:
+                log.debug("Cookie banner still visible: %s", e, extra=extra)
             return True
+        log.debug("No cookie banner handled.", extra=extra)
+        return False
+
+    try:
+        # Known selectors OR a button inside a consent container whose
+        # accessible name reads like "Accept" (as in the in-page script, a
+        # bare "OK" elsewhere on the page is not a cookie button): one
+        # locator, resolved in the page. The visibility filter runs there
+        # too, so hidden matches never reach .first; click() auto-waits for
+        # one to appear.
+        locator = (
+            page.locator(_ACCEPT_SELECTOR)
+            .or_(
+                page.locator(_CONSENT_CONTAINER_CSS)
+                .get_by_role("button", name=_ACCEPT_NAME_RE)
+            )
+            .locator("visible=true")
+            .first
+        )
+        # Described before the click (a dismissed banner no longer matches),
+        # since either branch of the locator may be the one that resolved.
+        target = await locator.evaluate(
+            "el => el.id ? '#' + el.id : el.tagName.toLowerCase() + ' ' + el.innerText.trim()",
+            timeout=2500,
+        )
+        await locator.click(timeout=2500)
+        log.debug("Clicked cookie accept button: %s", target, extra=extra)
+    except Exception as e:
+        log.debug("Cookie locator fallback failed: %s", e, extra=extra)
+    else:
+        try:
+            await locator.wait_for(state="hidden", timeout=2000)
         except Exception as e:
-            log.debug(f"Cookie text failed ({txt}): {e}", extra=extra)
+            log.debug("Cookie banner still visible: %s", e, extra=extra)
+        return True
 
     log.debug("No cookie banner handled.", extra=extra)
     return False
@@ -167,88 +327,679 @@ def handle_cookie_banner(page, *, extra: Dict[str, Any]) -> bool:
 # -------------------------
 # Scraping
 # -------------------------
-def fetch_html(
+# The extractor only reads text, so these are pure download/parse cost.
+# Stylesheets are opt-in (block_stylesheets): without CSS, banners and
+# buttons hidden by class look visible to the cookie script.
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+_BLOCKED_HOSTS = (
+    "googletagmanager.com",
+    "google-analytics.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+)
+
+
+# Chromium features a read-only fetch never uses.
+_LAUNCH_ARGS = [
+    "--disable-dev-shm-usage",
+    "--disable-features=Translate,BackForwardCache,InterestFeedContentSuggestions",
+    "--disable-renderer-backgrounding",
+]
+# Attach to an already running Chromium (e.g. one started with
+# --remote-debugging-port=9222) instead of paying a cold start per run.
+_CDP_ENDPOINT = os.environ.get("PLAYWRIGHT_CDP_ENDPOINT")
+_CONTEXT_OPTIONS = {
+    "service_workers": "block",    # no SW registration or background sync
+    "ignore_https_errors": True,   # a bad certificate should not hide a statement
+    "bypass_csp": True,
+}
+
+
+def _request_blocker(resource_types: frozenset):
+    """Route handler aborting the given resource types and tracker hosts."""
+    async def block(route) -> None:
+        request = route.request
+        host = urlparse(request.url).hostname or ""
+        if request.resource_type in resource_types or host.endswith(_BLOCKED_HOSTS):
+            await route.abort()
+        else:
+            await route.continue_()
+    return block
+
+
+# Serialize only what the extractor reads: <body> without scripts, styles,
+# inline SVG and similar, which on app-style pages are most of the markup.
+_BODY_HTML_JS = """
+() => {
+    const body = document.body;
+    if (!body) return document.documentElement.outerHTML;
+    const copy = body.cloneNode(true);
+    copy.querySelectorAll("script, style, noscript, template, svg, iframe")
+        .forEach((el) => el.remove());
+    return copy.outerHTML;
+}
+"""
+
+
+async def _fetch_page(
+    context_pw,
     url: str,
-    timeout: int = 60000,
-    headless: bool = True,
-    debug: bool = False,
-    context: Optional[Dict[str, Any]] = None,
+    timeout: int,
+    headless: bool,
+    debug: bool,
+    consented: Set[str],
+    extra: Dict[str, Any],
 ) -> Optional[str]:
+    """
+    Load one URL in a new page of an existing browser context.
+    Returns the html, or None on failure.
+    The HTML is the trimmed body unless debug is set, which keeps the full page.
+
+    consented holds hosts whose cookie banner was already accepted; the
+    consent cookie lives in the shared per-host context, so those pages
+    skip banner handling.
+    """
     start_time = time.time()
-    extra = _ctx(context, url)
+    page = None
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=headless)
-            context_pw = browser.new_context()
-            page = context_pw.new_page()
+        page = await context_pw.new_page()
+        log.debug("Navigating (headless=%s)", headless, extra=extra)
 
-            log.debug(f"Navigating (headless={headless})", extra=extra)
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+        except PlaywrightTimeoutError:
+            log.warning("page.goto timed out; continuing", extra=extra)
 
-            try:
-                page.goto(url, wait_until="networkidle", timeout=timeout)
-            except PlaywrightTimeoutError:
-                log.warning("page.goto timed out; continuing", extra=extra)
+        # Headings are what the extractor needs; that is the readiness signal.
+        try:
+            await page.wait_for_selector("h1, h2, h3, h4, h5", timeout=5000)
+        except PlaywrightTimeoutError:
+            log.debug("No headings within 5s; continuing", extra=extra)
 
-            page.wait_for_timeout(200)
-            handle_cookie_banner(page, extra=extra)
-            page.wait_for_timeout(300)
+        # Bounded grace period for XHR-delivered content. Analytics-heavy pages
+        # may never go idle, so this must not wait out the full timeout.
+        try:
+            await page.wait_for_load_state("networkidle", timeout=3000)
+        except PlaywrightTimeoutError:
+            pass
 
-            html = page.content()
+        host = urlparse(url).netloc.lower()
+        if host not in consented and await handle_cookie_banner(page, extra=extra):
+            consented.add(host)
 
-            elapsed = time.time() - start_time
-            logging.info(f"✅ SUCCESS: {url} ({elapsed:.2f}s)")
+        html = await page.content() if debug else await page.evaluate(_BODY_HTML_JS)
 
-            context_pw.close()
-            browser.close()
-            log.debug(f"Fetch complete in {elapsed:.2f}s", extra=extra)
-            return html
+        elapsed = time.time() - start_time
+        logging.info("✅ SUCCESS: %s (%.2fs)", url, elapsed)
+        log.debug("Fetch complete in %.2fs", elapsed, extra=extra)
+        return html
 
     except Exception as e:
         elapsed = time.time() - start_time
-        logging.info(f"❌ FAILED:  {url} ({elapsed:.2f}s)")
-        log.exception(f"Error fetching URL: {e}", extra=extra)
+        logging.info("❌ FAILED:  %s (%.2fs)", url, elapsed)
+        log.exception("Error fetching URL: %s", e, extra=extra)
         return None
 
+    finally:
+        if page is not None:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+
+async def _revalidate(
+    session, cache_conn, url: str, extra: Dict[str, Any]
+) -> Tuple[Optional[str], Optional[requests.Response]]:
+    """
+    Send a conditional GET using the cached ETag/Last-Modified for url.
+    Returns (cached HTML, None) on 304 Not Modified. Any other response is
+    returned as (None, response) so the static check can reuse its body;
+    (None, None) when nothing is cached or the request failed.
+    """
+    row = db.get_cached_page(cache_conn, url)
+    if not row or not (row["etag"] or row["last_modified"]):
+        return None, None
+
+    headers = {}
+    if row["etag"]:
+        headers["If-None-Match"] = row["etag"]
+    if row["last_modified"]:
+        headers["If-Modified-Since"] = row["last_modified"]
+
+    start_time = time.time()
+    try:
+        # requests is blocking; keep it off the event loop.
+        resp = await asyncio.to_thread(session.get, url, headers=headers, timeout=15)
+    except Exception as e:
+        # Not just RequestException: a malformed host raises LocationParseError.
+        log.debug("Conditional GET failed: %s", e, extra=extra)
+        return None, None
+
+    if resp.status_code != 304:
+        log.debug("Conditional GET returned %s; refetching", resp.status_code, extra=extra)
+        return None, resp
+
+    elapsed = time.time() - start_time
+    logging.info("✅ CACHED:  %s (%.2fs, not modified)", url, elapsed)
+    return row["body"], None
+
+
+# A server-rendered statement already has its headings in the raw HTML.
+_STATIC_HEADING_RE = re.compile(rb"<h[1-5][\s>]", re.IGNORECASE)
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    # Only gateway errors are retried. Unreachable hosts go straight on to
+    # the browser (urllib3 would log each connection retry to the console).
+    retry = Retry(
+        total=2, connect=0, read=0, backoff_factor=0.5,
+        status_forcelist=(502, 503, 504), allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_maxsize=16, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _try_static_fetch(
+    session, url: str, extra: Dict[str, Any], resp: Optional[requests.Response] = None
+) -> Tuple[Optional[str], Dict[str, str], Optional[Dict[str, List[str]]]]:
+    """
+    Plain GET for server-rendered pages (blocking; run it in a thread).
+    Returns (html, response headers, parsed sections) when the raw HTML
+    already yields statement sections, otherwise (None, {}, None) so the
+    page is rendered instead. resp, when given (a revalidation that came
+    back 200), is checked instead of issuing a second GET.
+    """
+    start_time = time.time()
+    if resp is None:
+        try:
+            resp = session.get(url, timeout=15)
+        except Exception as e:   # bad URLs fall through to the browser, which reports them
+            log.debug("Static GET failed: %s", e, extra=extra)
+            return None, {}, None
+
+    content_type = resp.headers.get("content-type", "")
+    if resp.status_code != 200 or "html" not in content_type:
+        log.debug(
+            "Static GET returned %s %s; rendering", resp.status_code, content_type, extra=extra
+        )
+        return None, {}, None
+
+    if not _STATIC_HEADING_RE.search(resp.content):
+        log.debug("No headings in static HTML; rendering", extra=extra)
+        return None, {}, None
+
+    # requests falls back to ISO-8859-1 for text/* without a charset.
+    if "charset" not in content_type.lower():
+        resp.encoding = "utf-8"
+    # UTF-8 bodies are checked as received; only accepted pages are decoded.
+    is_utf8 = (resp.encoding or "").lower().replace("_", "-") in ("utf-8", "utf8")
+    sections = _parse_sections(resp.content if is_utf8 else resp.text)
+    if not any(sections.values()):
+        log.debug("No statement sections in static HTML; rendering", extra=extra)
+        return None, {}, None
+
+    html = resp.text
+
+    elapsed = time.time() - start_time
+    logging.info("✅ STATIC:  %s (%.2fs)", url, elapsed)
+    return html, resp.headers, sections
+
+
+class Scraper:
+    """
+    Owns one Playwright browser for many fetches:
+
+        async with Scraper() as scraper:
+            html = await scraper.fetch_html(url)
+
+    The browser is launched on first use (never, if every URL is served from
+    the HTTP cache), or attached over CDP when PLAYWRIGHT_CDP_ENDPOINT is
+    set. Each host gets one browsing context shared by its pages, so
+    keep-alive connections and cookies carry over between URLs on the same
+    host. fetch_html may be awaited concurrently; see scrape_many.
+
+    With cache_path set, pages accepted by the static path are stored with
+    their ETag/Last-Modified, and each URL is first revalidated against that
+    cache; rendered pages are never cached (see _store).
+
+    With static_first (the default), a plain GET is tried before the browser;
+    pages whose raw HTML already has statement sections are never rendered.
+
+    block_resources aborts images, fonts, media and common trackers; turn it
+    off to see pages as a user would when debugging. block_stylesheets also
+    aborts CSS, for sites whose banners do not depend on it.
+    Pages come back as a trimmed <body> (no scripts, styles or SVG); debug
+    returns the full page.content() instead.
+    """
+
+    def __init__(
+        self,
+        timeout: int = 60000,
+        headless: bool = True,
+        debug: bool = False,
+        cache_path: Optional[str] = None,
+        block_resources: bool = True,
+        static_first: bool = True,
+        block_stylesheets: bool = False,
+    ):
+        self.timeout = timeout
+        self.headless = headless
+        self.debug = debug
+        self.block_resources = block_resources
+        self._block_requests = _request_blocker(
+            _BLOCKED_RESOURCE_TYPES | {"stylesheet"} if block_stylesheets else _BLOCKED_RESOURCE_TYPES
+        )
+        self.static_first = static_first
+        self._playwright = None
+        self._browser = None
+        self._contexts: Dict[str, Any] = {}
+        self._consented: Set[str] = set()   # hosts whose cookie banner was accepted
+        self._lock = asyncio.Lock()
+        self._cache_conn = db.init_http_cache(cache_path) if cache_path else None
+        self._session = _new_session()
+
+    async def __aenter__(self) -> "Scraper":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _launch(self) -> None:
+        self._playwright = await async_playwright().start()
+        try:
+            if _CDP_ENDPOINT:
+                # close() on a CDP browser only disconnects; it stays running.
+                self._browser = await self._playwright.chromium.connect_over_cdp(_CDP_ENDPOINT)
+            else:
+                self._browser = await self._playwright.chromium.launch(
+                    headless=self.headless, args=_LAUNCH_ARGS
+                )
+        except Exception:
+            await self._playwright.stop()
+            self._playwright = None
+            raise
+
+    async def _context_for(self, url: str):
+        host = urlparse(url).netloc.lower()
+        # Concurrent fetches must not launch two browsers or open two
+        # contexts for the same host.
+        async with self._lock:
+            context_pw = self._contexts.get(host)
+            if context_pw is None:
+                if self._browser is None:
+                    await self._launch()
+                context_pw = await self._browser.new_context(**_CONTEXT_OPTIONS)
+                if self.block_resources:
+                    await context_pw.route("**/*", self._block_requests)
+                self._contexts[host] = context_pw
+        return context_pw
+
+    async def fetch_html(self, url: str, context: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        html, _ = await self._fetch(url, context)
+        return html
+
+    async def _fetch(
+        self, url: str, context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[str], Optional[Dict[str, List[str]]]]:
+        """Like fetch_html, plus the sections the static check already parsed (or None)."""
+        extra = _ctx(context, url)
+
+        resp = None
+        if self._cache_conn is not None:
+            html, resp = await _revalidate(self._session, self._cache_conn, url, extra)
+            if html is not None:
+                return html, None
+
+        if self.static_first:
+            html, headers, sections = await asyncio.to_thread(
+                _try_static_fetch, self._session, url, extra, resp
+            )
+            if html is not None:
+                self._store(url, html, headers)
+                return html, sections
+
+        return await self._render(url, extra), None
+
+    def _store(self, url: str, html: str, headers: Dict[str, str]) -> None:
+        # Only raw server HTML is cached. A rendered page can change while its
+        # shell document (and so its ETag) stays the same, and would then be
+        # served from the cache forever.
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if self._cache_conn is not None and (etag or last_modified):
+            db.put_cached_page(
+                self._cache_conn, url, etag, last_modified, html,
+                datetime.now(ZoneInfo("Europe/London")).isoformat(timespec="seconds"),
+            )
+
+    async def _render(self, url: str, extra: Dict[str, Any]) -> Optional[str]:
+        try:
+            context_pw = await self._context_for(url)
+        except Exception as e:
+            logging.info("❌ FAILED:  %s", url)
+            log.exception("Error starting browser: %s", e, extra=extra)
+            return None
+
+        return await _fetch_page(
+            context_pw, url, self.timeout, self.headless, self.debug, self._consented, extra
+        )
+
+    async def close(self) -> None:
+        for context_pw in self._contexts.values():
+            try:
+                await context_pw.close()
+            except Exception:
+                pass
+        self._contexts.clear()
+        self._consented.clear()
+
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+        self._session.close()
+        if self._cache_conn is not None:
+            self._cache_conn.close()
+            self._cache_conn = None
+
+
+async def scrape_many(
+    urls: List[str],
+    concurrency: int = 8,
+    per_host: int = 2,
+    timeout: int = 60000,
+    headless: bool = True,
+    debug: bool = False,
+    contexts: Optional[Dict[str, Dict[str, Any]]] = None,
+    cache_path: Optional[str] = None,
+    block_resources: bool = True,
+    block_stylesheets: bool = False,
+    static_first: bool = True,
+    extract: bool = False,
+) -> Dict[str, Any]:
+    """
+    Fetch several URLs with one browser, at most `concurrency` pages at a time
+    and at most `per_host` of them on the same host. Returns {url: html or None}.
+
+    The per-host cap keeps a batch of same-site URLs from opening every tab
+    at once: the first pages settle the cookie banner (see Scraper) and the
+    rest of that host's URLs reuse the consent while other hosts proceed.
+
+    With extract=True each page is handed to extract_sections in a worker
+    process as soon as it has loaded, so parsing overlaps with rendering
+    instead of stalling the event loop; returns {url: sections or None}.
+    Pages taken from the static path were already parsed to be accepted and
+    are not parsed again.
+    """
+    contexts = contexts or {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    host_semaphores: Dict[str, asyncio.Semaphore] = {}
+    loop = asyncio.get_running_loop()
+    # Spawned, not forked: forking a process that already runs the event
+    # loop's helper threads can leave workers deadlocked on inherited locks.
+    pool = (
+        ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        if extract else None
+    )
+
+    try:
+        async with Scraper(
+            timeout=timeout,
+            headless=headless,
+            debug=debug,
+            cache_path=cache_path,
+            block_resources=block_resources,
+            block_stylesheets=block_stylesheets,
+            static_first=static_first,
+        ) as scraper:
+
+            async def fetch_one(url: str) -> Any:
+                host = urlparse(url).netloc.lower()
+                host_semaphore = host_semaphores.setdefault(
+                    host, asyncio.Semaphore(max(1, per_host))
+                )
+                # One bad URL (or a broken worker pool) must fail only that
+                # URL; gather would otherwise drop every other result.
+                try:
+                    # Host slot first, so waiting on a busy host never holds a global slot.
+                    async with host_semaphore, semaphore:
+                        html, sections = await scraper._fetch(url, context=contexts.get(url))
+                    if pool is not None and html:
+                        # Static pages were already parsed to accept them.
+                        if sections is not None:
+                            return _summarise_sections(sections)
+                        # Parse outside the semaphore so the next page can start loading.
+                        return await loop.run_in_executor(pool, extract_sections, html)
+                    return html
+                except Exception as e:
+                    logging.info("❌ FAILED:  %s", url)
+                    log.exception("Error scraping URL: %s", e, extra=_ctx(contexts.get(url), url))
+                    return None
+
+            results = await asyncio.gather(*(fetch_one(url) for url in urls))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return dict(zip(urls, results))
+
+
+def fetch_html(
+    url: str,
+    timeout: int = 60000,
+    headless: bool = True,
+    debug: bool = False,
+    context: Optional[Dict[str, Any]] = None,
+    block_resources: bool = True,
+) -> Optional[str]:
+    """One-shot sync fetch; use scrape_many to reuse the browser across URLs."""
+    results = asyncio.run(scrape_many(
+        [url],
+        timeout=timeout,
+        headless=headless,
+        debug=debug,
+        contexts={url: context} if context else None,
+        block_resources=block_resources,
+    ))
+    return results[url]
+
 
 # -------------------------
 # Extraction
 # -------------------------
-def extract_sections(html: str, debug: bool = False, context: Optional[Dict[str, Any]] = None) -> dict:
-    extra = _ctx(context, context["url"] if context and "url" in context else "unknown")
-    soup = BeautifulSoup(html, "lxml")
-    results = {}
-
-    headings = soup.find_all(["h1", "h2", "h3", "h4", "h5"])
-    heading_map = {
-        "feedback": ["feedback", "contact", "reporting"],
-        "enforcement": ["enforcement"],
-        "compliance_status": ["compliance status"],
-        "preparation": ["preparation"],
-        "non_accessible": [
-            "non-accessible", "not accessible", "does not fully meet",
-            "non compliance", "non-compliance", "content not accessible",
-            "not compliant", "partially compliant",
-        ],
+# Section key -> heading keywords. Order is priority: a heading matching
+# several keys is assigned to the first one listed.
+_HEADING_MAP = {
+    "feedback": ["feedback", "contact", "reporting"],
+    "enforcement": ["enforcement"],
+    "compliance_status": ["compliance status"],
+    "preparation": ["preparation"],
+    "non_accessible": [
+        "non-accessible", "not accessible", "does not fully meet",
+        "non compliance", "non-compliance", "content not accessible",
+        "not compliant", "partially compliant",
+    ],
+}
+_HEADING_PRIORITY = list(_HEADING_MAP)
+
+# All keywords in one pattern, a named group per section. The lookahead makes
+# matches zero-width so overlapping keywords are all reported by finditer.
+_HEADING_RE = re.compile(
+    "(?=(?:"
+    + "|".join(
+        f"(?P<{key}>{'|'.join(re.escape(k) for k in keywords)})"
+        for key, keywords in _HEADING_MAP.items()
+    )
+    + "))"
+)
+
+
+# Fuzzy fallback for headings the exact keywords miss ("Complaince status",
+# "Enforcment procedure"). Keywords stay in priority order so a tie goes to
+# the higher-priority key. 90 keeps "Contract details" out of feedback.
+_FUZZY_KEYWORDS = [(key, kw) for key, keywords in _HEADING_MAP.items() for kw in keywords]
+_FUZZY_CUTOFF = 90
+
+
+def _classify_heading(text_lower: str) -> Optional[str]:
+    """Return the section key for a lowercased heading, or None."""
+    found = {m.lastgroup for m in _HEADING_RE.finditer(text_lower)}
+    if found:
+        return next(key for key in _HEADING_PRIORITY if key in found)
+
+    # partial_ratio aligns the shorter string inside the longer, so a heading
+    # shorter than a keyword ("Status") would score 100 against it.
+    choices = {
+        key_kw: key_kw[1] for key_kw in _FUZZY_KEYWORDS if len(key_kw[1]) <= len(text_lower)
     }
+    match = process.extractOne(
+        text_lower, choices, scorer=fuzz.partial_ratio, score_cutoff=_FUZZY_CUTOFF
+    )
+    return match[2][0] if match else None
+
+
+_HEADING_TAGS = frozenset({"h1", "h2", "h3", "h4", "h5"})
+# Any heading closes the open section; only h1-h5 can open one.
+_SECTION_BREAK_TAGS = _HEADING_TAGS | {"h6"}
+# Text inside these stays on the surrounding line; other tags start a new line.
+_INLINE_TAGS = frozenset({
+    "a", "abbr", "b", "bdi", "bdo", "cite", "code", "data", "dfn", "em", "i",
+    "kbd", "mark", "q", "s", "samp", "small", "span", "strong", "sub", "sup",
+    "time", "u", "var",
+})
+# Not page content: code, fallback and inert markup, icon titles. Matches
+# what _BODY_HTML_JS removes, so static and rendered pages read the same.
+_NON_TEXT_TAGS = frozenset({"script", "style", "noscript", "template", "svg", "iframe"})
+
+
+class _AllSectionsFound(Exception):
+    """Raised by _SectionTarget to stop the parser once nothing is left to find."""
+
+
+class _SectionTarget:
+    """
+    lxml parser target that splits the document into {section key: [lines]}
+    as it is parsed, so no element tree is ever built.
+
+    Text arrives through data() in document order. A section runs from its
+    matching heading to the next h1-h6; a later heading for the same key
+    replaces the earlier one. Once every key has a section and the last one
+    has closed, parsing stops (_AllSectionsFound): the rest of the page,
+    usually footer and navigation, is never read.
+    """
 
-    def match_heading(text, targets):
-        return any(t in text.lower() for t in targets)
-
-    for heading in headings:
-        text = heading.get_text(strip=True).lower()
-        for key, keywords in heading_map.items():
-            if key == "non_accessible" and match_heading(text, keywords):
-                results[key] = "\n".join(s.get_text(strip=True) for s in heading.find_all_next())
-                break
-            elif match_heading(text, keywords):
-                content = []
-                for s in heading.find_all_next():
-                    if s.name and s.name.startswith("h"):
-                        break
-                    content.append(s.get_text(strip=True))
-                results[key] = "\n".join(content)
-                break
+    def __init__(self):
+        self.sections: Dict[str, List[str]] = {}
+        self.current: Optional[List[str]] = None   # lines of the open section
+        self.line: List[str] = []                  # fragments of the line being built
+        self.heading: Optional[List[str]] = None   # fragments of the heading being read
+        self.skip = 0                              # depth inside _NON_TEXT_TAGS
+
+    def _flush(self) -> None:
+        if self.line:
+            text = " ".join("".join(self.line).split())
+            self.line.clear()
+            if text and self.current is not None:
+                self.current.append(text)
+
+    def start(self, tag, attrib) -> None:
+        if tag in _NON_TEXT_TAGS:
+            self.skip += 1
+            return
+        if self.skip:
+            return   # markup inside svg/template etc. must not break lines
+        if tag not in _INLINE_TAGS:
+            self._flush()
+        if tag in _SECTION_BREAK_TAGS:
+            if len(self.sections) == len(_HEADING_MAP):
+                raise _AllSectionsFound
+            self.current = None
+            self.heading = []
+
+    def end(self, tag) -> None:
+        if tag in _NON_TEXT_TAGS:
+            self.skip -= 1
+        elif self.skip:
+            return
+        elif tag in _SECTION_BREAK_TAGS and self.heading is not None:
+            text = " ".join("".join(self.heading).split()).lower()
+            self.heading = None
+            key = _classify_heading(text) if tag in _HEADING_TAGS else None
+            if key is not None:
+                self.current = self.sections[key] = []
+        elif tag not in _INLINE_TAGS:
+            self._flush()
+
+    def data(self, data) -> None:
+        if not self.skip:
+            (self.line if self.heading is None else self.heading).append(data)
+
+    def close(self) -> Dict[str, List[str]]:
+        self._flush()
+        return self.sections
+
+
+# Cheap raw-text screen: every _HEADING_MAP keyword contains one of these, so
+# an exact heading match always gets through. Headings only the fuzzy
+# fallback would catch ("Complaince status") get through because the page
+# says "accessib..." somewhere, as every statement does in its title or h1.
+# A page with neither is skipped on purpose: it is not a statement.
+_PRESCAN_RE = re.compile(
+    r"accessib|complian|feedback|contact|reporting|enforcement|preparation|does not fully meet",
+    re.IGNORECASE,
+)
+_PRESCAN_BYTES_RE = re.compile(_PRESCAN_RE.pattern.encode(), re.IGNORECASE)
+
+_FEED_CHUNK = 64 * 1024
+
+
+def _parse_sections(html: Union[str, bytes]) -> Dict[str, List[str]]:
+    """Section lines for a page given as str or UTF-8 bytes."""
+    prescan = _PRESCAN_RE if isinstance(html, str) else _PRESCAN_BYTES_RE
+    if not prescan.search(html):
+        return {}
+
+    # Parse bytes with an explicit encoding: lxml rejects str input that
+    # carries an XML encoding declaration. Bytes are used as they are.
+    data = html.encode("utf-8") if isinstance(html, str) else html
+    target = _SectionTarget()
+    parser = etree.HTMLParser(target=target, encoding="utf-8")
+    try:
+        # Fed in chunks so an early _AllSectionsFound skips the remaining
+        # bytes; a single feed would still tokenize the whole page.
+        for i in range(0, len(data), _FEED_CHUNK):
+            parser.feed(data[i:i + _FEED_CHUNK])
+        return parser.close()
+    except _AllSectionsFound:
+        return target.sections
+    except (etree.ParserError, etree.XMLSyntaxError, ValueError):
+        return {}
+
+
+def extract_sections(html: Union[str, bytes], debug: bool = False, context: Optional[Dict[str, Any]] = None) -> dict:
+    extra = _ctx(context, context["url"] if context and "url" in context else "unknown")
+
+    results = _summarise_sections(_parse_sections(html))
+    log.debug("Extraction complete", extra=extra)
+    return results
+
+
+def _summarise_sections(sections: Dict[str, List[str]]) -> dict:
+    """Join parsed section lines and derive the summary fields from them."""
+    results = {key: "\n".join(lines) for key, lines in sections.items()}
 
     results["feedback_present"] = "yes" if results.get("feedback") else "no"
     results["enforcement_present"] = "yes" if results.get("enforcement") else "no"
@@ -257,37 +1008,74 @@ def extract_sections(html: str, debug: bool = False, context: Optional[Dict[str,
     results["wcag"] = extract_wcag_version(results.get("compliance_status", "") or "")
     results["compliance_level"] = extract_compliance_level(results.get("compliance_status", "") or "")
     results["issue_text"] = results.get("non_accessible", "").strip() or None
-
-    log.debug("Extraction complete", extra=extra)
     return results
 
 
+_DATE_HEAD_RE = re.compile(
+    r"(?:last\s+reviewed(?:\s+on)?|reviewed(?:\s+on)?|last\s+updated|updated(?:\s+on)?)\s*[:\-]?\s*(.*)",
+    re.IGNORECASE,
+)
+# Cheap pre-screen so dateutil only sees text that looks like a date:
+# 4 March 2024 / 4th March 2024 / 04/03/2024 / 2024-03-04 / March 4, 2024 / March 2024
+_DATE_SHAPE_RE = re.compile(
+    r"\b(\d{1,2}(?:st|nd|rd|th)?[-/ ](?:\d{1,2}|[A-Za-z]{3,9})[-/ ]\d{2,4}"
+    r"|\d{4}-\d{2}-\d{2}"
+    r"|[A-Za-z]{3,9}\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}"
+    r"|[A-Za-z]{3,9}\s+\d{4})\b"
+)
+# Month-only dates ("March 2024") resolve to the 1st rather than today's day.
+_DATE_DEFAULT = datetime(2000, 1, 1)
+# Common shapes tried with strptime before dateutil. Numeric dates are read
+# month-first to give the same answer dateutil does; it swaps only when the
+# first number cannot be a month, and such dates fall through to it.
+_DATE_FORMATS = (
+    "%d %B %Y", "%d %b %Y",
+    "%Y-%m-%d",
+    "%B %d, %Y", "%b %d, %Y", "%B %d %Y",
+    "%B %Y", "%b %Y",
+    "%m/%d/%Y", "%m-%d-%Y",
+)
+
+
 def extract_last_review_date(text: str) -> Optional[str]:
+    match = _DATE_HEAD_RE.search(text)
+    if not match:
+        return None
+
+    shape = _DATE_SHAPE_RE.search(match.group(1)[:200])
+    if not shape:
+        return None
+
+    candidate = shape.group(1)
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(candidate, fmt).date().isoformat()
+        except ValueError:
+            pass
+
+    # Ordinals, two-digit years, day-first fallbacks and other rarer shapes.
     try:
-        pattern = r"(last reviewed(?: on)?|reviewed(?: on)?|last updated|updated(?: on)?)\s*[:\-]?\s*(.*)"
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            candidate = match.group(2).split("\n")[0][:200]
-            parsed = date_parser.parse(candidate, fuzzy=True)
-            return parsed.date().isoformat()
-    except Exception:
-        pass
-    return None
+        return date_parser.parse(candidate, default=_DATE_DEFAULT).date().isoformat()
+    except (ValueError, OverflowError):
+        return None
+
+
+# Digit lookarounds rather than \b so "WCAG2.1" still matches but "12.1" does not.
+_WCAG_RE = re.compile(r"(?<!\d)2\.([012])(?!\d)")
 
 
 def extract_wcag_version(text: str) -> Optional[str]:
-    for v in ("2.2", "2.1", "2.0"):
-        if v in (text or ""):
-            return v
-    return None
+    # Highest version mentioned wins, as before ("2.1 and 2.2" -> 2.2).
+    minors = _WCAG_RE.findall(text or "")
+    return f"2.{max(minors)}" if minors else None
+
+
+_COMPLIANCE_RE = re.compile(r"(not\s+compliant)|(partial(?:ly)?)|(fully\s+compliant)", re.IGNORECASE)
+_COMPLIANCE_LEVELS = {1: "Not Compliant", 2: "Partially Compliant", 3: "Fully Compliant"}
 
 
 def extract_compliance_level(text: str) -> Optional[str]:
-    t = (text or "").lower()
-    if "fully" in t and "compliant" in t:
-        return "Fully Compliant"
-    if "partial" in t:
-        return "Partially Compliant"
-    if "not compliant" in t:
-        return "Not Compliant"
-    return None
+    # The first statement in the text wins: 'not compliant ... we aim to be
+    # fully compliant by 2025' is Not Compliant.
+    m = _COMPLIANCE_RE.search(text or "")
+    return _COMPLIANCE_LEVELS[m.lastindex] if m else None